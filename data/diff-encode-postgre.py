@@ -3,24 +3,42 @@
 database rows recalculated as diffs from the first row item
 '''
 
+import csv
+import io
 import pandas as pd
 from sqlalchemy import create_engine
+from sqlalchemy import inspect
 from sqlalchemy import types
 from itertools import chain
 
-def diff_encode(row):
-    values = row
-    for i, val in enumerate(row[3:]):
-        values[3+i] = val - row[2]
-    return values
-            
+# to_sql method streaming the rows through COPY instead of one INSERT each
+def copy_insert(table, conn, keys, data_iter):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(data_iter)
+    buf.seek(0)
+    columns = ', '.join('"{}"'.format(k) for k in keys)
+    name = '"{}"'.format(table.name) if table.schema is None else '"{}"."{}"'.format(table.schema, table.name)
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f'COPY {name} ({columns}) FROM STDIN WITH CSV', buf)
+
 
 user = ''
 database = ''
 table = "w01_d1"
 
 engine = create_engine(f'postgresql://{user}@localhost:5432/{database}')
-df = pd.read_sql_query(f'select * from "{table}_hourly"',con=engine)
+query = f'select * from "{table}_hourly"'
+
+# types fixed once from the source table, a chunk would otherwise be typed
+# on its own values (integer columns with a NULL turn into floats)
+columns = inspect(engine).get_columns(f'{table}_hourly')
+read_dtype = {c['name']: 'Int64' for c in columns if isinstance(c['type'], types.Integer)}
+sql_dtype = {c['name']: c['type'] for c in columns}
 
-df2 = df.apply(diff_encode, axis=1, raw=False, result_type=None)
-df2.to_sql(f'{table}_diff', con=engine, if_exists='fail', method=None)
+# server side cursor, only one chunk of rows in memory at a time
+with engine.connect() as conn:
+    chunks = pd.read_sql_query(query, con=conn.execution_options(stream_results=True), chunksize=50_000, dtype=read_dtype)
+    for i, df in enumerate(chunks):
+        # subtract the first value column from all later ones, row-aligned
+        df.iloc[:, 3:] = df.iloc[:, 3:].sub(df.iloc[:, 2], axis=0)
+        df.to_sql(f'{table}_diff', con=engine, if_exists='fail' if i == 0 else 'append', method=copy_insert, index=False, dtype=sql_dtype)
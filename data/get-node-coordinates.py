@@ -5,7 +5,9 @@ Return csv with coordinates for each OSM node from the input file
 
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import polars as pl
 import osmapi as osm
 
 api = osm.OsmApi()
@@ -15,19 +17,40 @@ parser.add_argument('indir', type=os.path.abspath, help='Input CSV')
 parser.add_argument('outdir', type=os.path.abspath, help='Output CSVs')
 args = parser.parse_args()
 
-os.chdir(args.indir)
-node_list =  np.loadtxt(open(args.indir, "rb"))
+node_list = pl.read_csv(args.indir, has_header=False)[:, 0].to_numpy()
 
-output = np.empty((0,3))
-for i in node_list:
+# the API accepts a batch of ids per request, keep the URL reasonably short
+batch_size = 100
+ids = node_list.tolist()
+batches = [ids[i:i+batch_size] for i in range(0, len(ids), batch_size)]
+
+# one unknown id fails the whole batch, retry its ids one by one
+def get_nodes(batch):
+    print("Processing nodes {}-{}".format(batch[0], batch[-1]))
     try:
-        node = api.NodeGet(i.astype(int)) 
-        print("Processing node {}".format(i.astype(int)))
-    except:
-        pass
-    output = np.append(output, np.array([[node['id'], node['lat'], node['lon']]]), axis=0
-
-# save with no scientific notation, zero decimals for the first column
-# note: with multielement format, delimiter needs to be specified there 
-# not in delimiter property
-np.savetxt(args.outdir, output, encoding='utf-8-sig', fmt='%.0f, %f, %f')
+        return api.NodesGet(batch)
+    except osm.ApiError as e:
+        print("Batch {}-{} failed ({}), fetching nodes one by one".format(batch[0], batch[-1], e))
+    nodes = {}
+    for i in batch:
+        try:
+            nodes[i] = api.NodeGet(i)
+        except osm.ApiError as e:
+            print("Skipping node {} ({})".format(i, e))
+    return nodes
+
+output = np.empty((len(ids), 3))
+found = 0
+with ThreadPoolExecutor(max_workers=8) as executor:
+    for nodes in executor.map(get_nodes, batches):
+        for node in nodes.values():
+            # deleted nodes come back without coordinates
+            if 'lat' not in node:
+                continue
+            output[found] = node['id'], node['lat'], node['lon']
+            found += 1
+output = output[:found]
+
+# integer ids, full precision coordinates
+frame = pl.DataFrame({'id': output[:, 0].astype(np.int64), 'lat': output[:, 1], 'lon': output[:, 2]})
+frame.write_csv(args.outdir, include_header=False)
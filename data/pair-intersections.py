@@ -7,6 +7,8 @@ import argparse
 import os
 import glob
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv
 import time
 
 parser = argparse.ArgumentParser(description='Get pair intersections')
@@ -14,15 +16,22 @@ parser.add_argument('indir', type=os.path.abspath, help='Input CSV')
 parser.add_argument('outdir', type=os.path.abspath, help='Output CSVs')
 args = parser.parse_args()
 
-# recursive pandas intersection
+# parse only the pair columns, straight to int64
+read_options = csv.ReadOptions(autogenerate_column_names=True)
+convert_options = csv.ConvertOptions(
+    include_columns=['f0', 'f1'],
+    column_types={'f0': pa.int64(), 'f1': pa.int64()},
+)
+
+# intersection of (col0, col1) pairs, one index per file
 def intersect(files):
-    if (len(files) > 1):
-        chunk = pd.read_csv(files[0], header=None, usecols=[0,1], low_memory=False)
-        chunk.convert_dtypes(convert_integer=True)
-        print(f'Files to process: {len(files)}')
-        return pd.merge(chunk, intersect(files[1:]), how='inner')
-    else:
-        return pd.read_csv(files[0], header=None, usecols=[0,1], low_memory=False)
+    pairs = None
+    for i, file in enumerate(files):
+        print(f'Files to process: {len(files) - i}')
+        chunk = csv.read_csv(file, read_options=read_options, convert_options=convert_options)
+        index = pd.MultiIndex.from_arrays([chunk['f0'].to_numpy(), chunk['f1'].to_numpy()])
+        pairs = index if pairs is None else pairs.intersection(index)
+    return pairs.to_frame(index=False)
 
 os.chdir(args.indir)
 filenames = [i for i in glob.glob('*.{}'.format('csv'))]
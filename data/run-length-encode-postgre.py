@@ -4,33 +4,43 @@ RLE calculation from database rows
 Adds a table with pgsql array of run length encoded integers
 '''
 
+import numpy as np
 import pandas as pd
+from numba import njit
 from sqlalchemy import create_engine
+from sqlalchemy import inspect
 from sqlalchemy import types
-from itertools import chain
-
-rleFrameData = []
-
-def rle_encode(row):
-    runs = []
-    run = []
-    speeds = row[2:]
-
-    for i, val in enumerate(speeds):
-        if i == 0:
-            run.append(val)
-        else:
-            if val == speeds[i-1]:
-                run.append(val)
-            else:
-                runs.append(run)
-                run = []
-                run.append(val)
-            
-    runs.append(run)
-    rle = list(chain.from_iterable((len(run), run[0]) for run in runs ))
-    output = speeds.values.tolist() if len(rle)>22 else rle
-    rleFrameData.append([row[0], row[1], output])
+
+# rows needing more (length, value) pairs than this are stored unencoded
+max_pairs = 11
+
+@njit(cache=True)
+def rle_all(mat, max_pairs):
+    n_rows, n_cols = mat.shape
+    out = np.empty((n_rows, 2*max_pairs), dtype=mat.dtype)
+    pairs = np.zeros(n_rows, dtype=np.int64)
+    for r in range(n_rows):
+        n = 0
+        run = 1
+        for c in range(1, n_cols+1):
+            # NULL speeds arrive as NaN, a run of them is still one run
+            if c < n_cols and (mat[r, c] == mat[r, c-1] or (np.isnan(mat[r, c]) and np.isnan(mat[r, c-1]))):
+                run += 1
+                continue
+            if n == max_pairs:
+                # encoding does not pay off, flag the row
+                n = -1
+                break
+            out[r, 2*n] = run
+            out[r, 2*n+1] = mat[r, c-1]
+            n += 1
+            run = 1
+        pairs[r] = n
+    return out, pairs
+
+# back to integers for the int[] column, NaN becomes a NULL element
+def to_ints(values):
+    return [None if v != v else int(v) for v in values]
 
 
 user = ''
@@ -38,8 +48,23 @@ database = ''
 table = ''
 
 engine = create_engine(f'postgresql://{user}@localhost:5432/{database}')
-df = pd.read_sql_query(f'select * from "{table}_hourly"',con=engine)
+query = f'select * from "{table}_hourly"'
+
+# speeds always read as float64, a chunk would otherwise be typed on its
+# own values (int64 without NULLs, float64 with them)
+columns = [c['name'] for c in inspect(engine).get_columns(f'{table}_hourly')]
+read_dtype = dict.fromkeys(columns[2:], 'float64')
 
-df.apply(rle_encode, axis=1, raw=False, result_type=None)
-rleFrame = pd.DataFrame(rleFrameData, columns = ['start_node', 'end_node', table])
-rleFrame.to_sql(f'{table}_rle', con=engine, if_exists='fail', method=None)
+# server side cursor, only one chunk of rows in memory at a time
+with engine.connect() as conn:
+    chunks = pd.read_sql_query(query, con=conn.execution_options(stream_results=True), chunksize=50_000, dtype=read_dtype)
+    for i, df in enumerate(chunks):
+        nodes = df.iloc[:, :2].itertuples(index=False, name=None)
+        speeds = np.ascontiguousarray(df.iloc[:, 2:].to_numpy())
+        rle, pairs = rle_all(speeds, max_pairs)
+        rleFrameData = [
+            [start, end, to_ints(speeds[r].tolist() if n < 0 else rle[r, :2*n].tolist())]
+            for r, ((start, end), n) in enumerate(zip(nodes, pairs.tolist()))
+        ]
+        rleFrame = pd.DataFrame(rleFrameData, columns = ['start_node', 'end_node', table])
+        rleFrame.to_sql(f'{table}_rle', con=engine, if_exists='fail' if i == 0 else 'append', method='multi', chunksize=10_000, index=False, dtype={table: types.ARRAY(types.Integer)})
@@ -16,6 +16,9 @@ import argparse
 import os
 import glob
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv
+import sys
 import time
 from functools import reduce
 import sqlite3
@@ -31,10 +34,26 @@ suffix = 'brno'
 
 
 # selection funtion 
+# indexed join on both pair columns
 def getResults(table_name):
-  conn = sqlite3.connect("voters.sqlite")
-  q = 'SELECT * FROM "{}" WHERE street in pairs'.format(table_name.replace('"', '""'))
-  return pd.read_sql_query(q, conn)
+  q = 'SELECT s.* FROM "{}" s INNER JOIN pairs p ON s.c0 = p.c0 AND s.c1 = p.c1'.format(table_name.replace('"', '""'))
+  return pd.read_sql_query(q, db)
+
+# large reads straight into the parser, on linux the file is memory
+# mapped and paged in by kernel readahead instead of read() copies
+block_size = 8 << 20
+
+def openInput(file):
+    return pa.memory_map(file) if sys.platform == 'linux' else pa.OSFile(file)
+
+# multithreaded arrow parser, record batches go to sqlite without pandas
+def read_batches(file):
+    read_options = csv.ReadOptions(autogenerate_column_names=True, block_size=block_size)
+    with openInput(file) as source:
+        yield from csv.open_csv(source, read_options=read_options)
+
+def rows(batch):
+    return zip(*(column.to_pylist() for column in batch.columns))
 
 os.chdir(args.indir)
 filenames = [i for i in glob.glob('*.{}'.format('csv'))]
@@ -44,18 +63,44 @@ t0 = time.time()
 # create db file
 db_file_name = 'segments.sqlite'
 db = sqlite3.connect(db_file_name)
+db.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-200000;
+''')
+
+def quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+# named integer columns c0, c1, ... so the join columns can be indexed
+def createTable(table_name, n_cols):
+    cols = ', '.join(f'c{i} INTEGER' for i in range(n_cols))
+    db.execute(f'CREATE TABLE {quote(table_name)} ({cols})')
+    return f'INSERT INTO {quote(table_name)} VALUES ({", ".join("?" * n_cols)})'
+
+# index after the bulk load, cheaper than maintaining it per insert
+def createIndex(table_name):
+    db.execute(f'CREATE INDEX {quote("idx_" + table_name)} ON {quote(table_name)}(c0, c1)')
 
 # list of what I want to find
-nodePairs = pd.read_csv(args.nodePairs, header=None)
-nodePairs.to_sql('pairs', db )
+nodePairs = pd.read_csv(args.nodePairs, header=None, usecols=[0,1])
+with db:
+    insert = createTable('pairs', 2)
+    db.executemany(insert, nodePairs.itertuples(index=False, name=None))
+    createIndex('pairs')
 
 for file in filenames:
     table_name = f"segments_{file.split('.')[0]}"
-    for chunk in pd.read_csv(file, header=None, chunksize=5000):
-        # append to db 
-        chunk.to_sql(table_name, db, if_exists="append")
-    # regular format doeas not work here, use ?
-    db.execute('CREATE INDEX street ON "{}"(0,1)'.format(table_name.replace('"', '""')))
+    insert = None
+    # one transaction per file
+    with db:
+        for batch in read_batches(file):
+            if insert is None:
+                insert = createTable(table_name, batch.num_columns)
+            # append to db 
+            db.executemany(insert, rows(batch))
+        createIndex(table_name)
     output = getResults(table_name)
     output.to_csv("{0}/{2}-{1}".format(args.outdir, file, suffix), encoding='utf-8-sig', header=False, index=False)
 
@@ -24,20 +24,21 @@ args = parser.parse_args()
 suffix = 'brno'
 
 # list of what is searched
-nodePairs = dd.read_csv(args.nodePairs, header=None)
-nodePairs.set_index([0])
+# small enough to broadcast to every partition of the traffic file
+nodePairs = dd.read_csv(args.nodePairs, header=None, usecols=[0,1], dtype='int64')
+nodePairs = nodePairs.drop_duplicates().repartition(npartitions=1).persist()
 
 def get_matched_segments(chunk):
-    frame = chunk.merge(nodePairs)
+    frame = chunk.merge(nodePairs, on=[0,1], how='inner', broadcast=True)
     return frame
         
 os.chdir(args.indir)
 filenames = [i for i in glob.glob('*.{}'.format('csv'))]
 
 t0 = time.time()
-dtype = {}
-for i in range(2016):
-    dtype[i] = 'int64'
+# osm node ids need 64 bits, speeds fit in 16
+dtype = {i: 'int16' for i in range(2, 2016)}
+dtype.update({0: 'int64', 1: 'int64'})
 
 for file in filenames:
     chunks = dd.read_csv(file, header=None, dtype=dtype) # blocksize calculated automatically
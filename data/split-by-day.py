@@ -6,7 +6,7 @@ Split weekly time series table into per-day files
 import argparse
 import os
 import glob
-import pandas as pd
+import polars as pl
 import time
 
 parser = argparse.ArgumentParser(description='Split by day')
@@ -29,10 +29,13 @@ filenames = [i for i in glob.glob('*.{}'.format('csv'))]
 
 for file in filenames:
     t0 = time.time()
+    # read once, slice each day in memory
+    # every column as string, values are only sliced and written back
+    week = pl.read_csv(file, has_header=False, infer_schema_length=0)
     for i in range(1,8):
         cols = get_cols_range(i)
-        chunks = pd.read_csv(file, header=None, usecols=cols, low_memory=False)
-        chunks.to_csv("{0}/w{1}-d{2}.csv".format(args.outdir, file, i), encoding='utf-8-sig', header=False, index=False)
+        chunks = week[:, cols]
+        chunks.write_csv("{0}/w{1}-d{2}.csv".format(args.outdir, file, i), include_header=False)
     elapsed = time.time() - t0
     msg = 'split one file in {:.2f} s'
     print(msg.format(elapsed))
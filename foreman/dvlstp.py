@@ -14,6 +14,7 @@ import sys
 import argparse
 import git
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 
 DB_NAME = 'foreman-db-1'
@@ -23,6 +24,7 @@ fm_dir = pwd + '/foreman'
 # parse arguments
 parser = argparse.ArgumentParser(description='')
 parser.add_argument("-u", "--update-repos",  dest='repos', action='store_true', help="update repositories only" )
+parser.add_argument("-j", "--jobs", dest='jobs', type=int, default=8, help="number of repositories updated in parallel" )
 args = parser.parse_args()
 
 class color:
@@ -43,26 +45,31 @@ def start_db():
     subprocess.run('docker start {}'.format(DB_NAME), shell=True, check=True)
     print("OK")
 
+def update_repo(repo_name):
+    """Check out the main branch of a repository and pull it"""
+    t0 = time.time()
+    repo_path = pwd + '/' + repo_name
+    repo = git.Repo(repo_path)
+    if (repo_name == 'foreman'):
+        repo.git.checkout('develop')
+    else:
+        repo.git.checkout('master')
+    origin = repo.remote(name='origin')
+    origin.pull()
+    return time.time() - t0
+
 def update_repos():
     """Update Foreman and plugins repositories"""
     # list subdirs
     repo_names = [x for x in next(os.walk(pwd))[1]] 
     repo_count = len(repo_names)
     print(color.GREEN + "Updating {} repositories:".format(repo_count) + color.END)
-    for repo_name in repo_names:
-        t0 = time.time()
-        repo_path = pwd + '/' + repo_name
-        repo = git.Repo(repo_path)
-        if (repo_name == 'foreman'):
-            repo.git.checkout('develop')
-        else:
-            repo.git.checkout('master')
-        origin = repo.remote(name='origin')
-        origin.pull()
-        elapsed = time.time() - t0
-        order_no = repo_names.index(repo_name) + 1
-        msg = '[{}/{}] '+ color.BOLD +'{}'+ color.END +' repo updated in {:.2f} s'
-        print(msg.format(order_no, repo_count, repo_name, elapsed))
+    # repos are independent, pull them concurrently, report in order
+    with ThreadPoolExecutor(max_workers=max(1, min(args.jobs, repo_count))) as executor:
+        timings = executor.map(update_repo, repo_names)
+        for order_no, (repo_name, elapsed) in enumerate(zip(repo_names, timings), 1):
+            msg = '[{}/{}] '+ color.BOLD +'{}'+ color.END +' repo updated in {:.2f} s'
+            print(msg.format(order_no, repo_count, repo_name, elapsed))
 
 def package_update():
     """Install gems and npm modules"""